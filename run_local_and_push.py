@@ -13,11 +13,11 @@ def _run(cmd: list[str]) -> None:
 
 
 def _has_snapshot_changes() -> bool:
+    # Truthiness is all we need, so skip decoding the porcelain output.
     result = subprocess.run(
-        ["git", "status", "--porcelain", "snapshots"],
+        ["git", "status", "--porcelain", "--", "snapshots"],
         check=True,
         capture_output=True,
-        text=True,
     )
     return bool(result.stdout.strip())
 
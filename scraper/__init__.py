@@ -3,23 +3,37 @@
 
 from __future__ import annotations
 
+import functools
 import json
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json still works
+    orjson = None
+
 STORES_PATH = Path("input/stores.json")
 SKUS_PATH = Path("input/skus.json")
 
 
+def _loads(payload: bytes) -> dict | list:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+@functools.lru_cache(maxsize=1)
 def load_stores(path: Path = STORES_PATH) -> list[dict[str, str]]:
-    data = json.loads(path.read_text(encoding="utf-8"))
+    data = _loads(path.read_bytes())
     stores = data.get("stores", [])
     if not isinstance(stores, list):
         raise ValueError("input/stores.json must contain a 'stores' list")
     return stores
 
 
+@functools.lru_cache(maxsize=1)
 def load_skus(path: Path = SKUS_PATH) -> list[str]:
-    data = json.loads(path.read_text(encoding="utf-8"))
+    data = _loads(path.read_bytes())
 
     if isinstance(data, dict):
         raw_skus = data.get("skus", [])
@@ -51,7 +65,3 @@ def iter_store_targets(path: Path = STORES_PATH):
 def main() -> None:
     for store_id, store_slug in iter_store_targets():
         print(f"Processing store_id={store_id} store_slug={store_slug}")
-
-
-if __name__ == "__main__":
-    main()
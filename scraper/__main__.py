@@ -0,0 +1,6 @@
+"""Allows ``python -m scraper`` for the quick input validation loop."""
+
+from scraper import main
+
+if __name__ == "__main__":
+    main()
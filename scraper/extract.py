@@ -0,0 +1,318 @@
+"""Extraction of embedded product data from Walmart product pages.
+
+Shared by every transport (httpx, Playwright): given raw HTML, pull the
+``__NEXT_DATA__`` / Redux JSON and distill the product fields for a SKU.
+Annotated precisely so the module stays ready for an ahead-of-time
+compiler such as mypyc should one ever be wired up.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json still works
+    orjson = None
+
+_NEXT_DATA_RE = re.compile(rb'<script[^>]*\bid="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+_WML_STATE_RE = re.compile(rb"__WML_REDUX_INITIAL_STATE__\s*=\s*\{")
+
+_PRICE_CLEAN_RE = re.compile(r"[^0-9.,\-]")
+_TITLE_KEYS = ("name", "title", "productName")
+_CUR_PRICE_KEYS = ("currentPrice", "price", "priceDisplay", "finalPrice")
+_REG_PRICE_KEYS = ("wasPrice", "regularPrice", "listPrice", "compareAtPrice")
+_AVAIL_KEYS = ("availabilityStatus", "availabilityText", "fulfillmentLabel", "inventoryStatus")
+_PRICE_SUBKEYS = ("price", "value", "amount", "current", "minPrice")
+
+# Negative phrases come first so "unavailable" can never match its
+# "available" suffix; one search replaces the old two-branch token scan.
+_AVAIL_RE = re.compile(
+    r"out of stock|sold out|rupture|unavailable|in ?stock|available|pickup"
+)
+_AVAIL_MAP = {
+    "out of stock": False,
+    "sold out": False,
+    "rupture": False,
+    "unavailable": False,
+    "in stock": True,
+    "instock": True,
+    "available": True,
+    "pickup": True,
+}
+
+_DECODER = json.JSONDecoder()
+
+_EXTRACT_CACHE_MAX = 2048
+_extract_cache: dict[bytes, dict | list | None] = {}
+
+
+def json_loads(payload: str | bytes) -> dict | list:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def json_dumps(payload: object) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _decode_braced_json(raw_text: str, marker: str) -> dict | list | None:
+    """Parse the JSON object assigned right after ``marker`` in a script body.
+
+    raw_decode consumes exactly one JSON value and reports where it ended,
+    so there is no need to balance braces by hand before parsing.
+    """
+    marker_pos = raw_text.find(marker)
+    if marker_pos < 0:
+        return None
+
+    start = raw_text.find("{", marker_pos)
+    if start < 0:
+        return None
+
+    try:
+        obj, _ = _DECODER.raw_decode(raw_text, start)
+    except ValueError:
+        return None
+    return obj
+
+
+def extract_embedded_data(html: str | bytes) -> dict | list | None:
+    raw = html.encode("utf-8", "surrogatepass") if isinstance(html, str) else html
+
+    # The same SKU fetched for several stores often returns byte-identical
+    # HTML; key the parsed result on a digest so the JSON parse runs once.
+    key = hashlib.blake2b(raw, digest_size=16).digest()
+    if key in _extract_cache:
+        return _extract_cache[key]
+
+    result = extract_embedded_data_uncached(raw)
+    if len(_extract_cache) >= _EXTRACT_CACHE_MAX:
+        _extract_cache.clear()
+    _extract_cache[key] = result
+    return result
+
+
+def extract_embedded_data_uncached(raw: bytes) -> dict | list | None:
+    match = _NEXT_DATA_RE.search(raw)
+    if match:
+        try:
+            return json_loads(match.group(1))
+        except ValueError:
+            pass
+
+    match = _WML_STATE_RE.search(raw)
+    if match:
+        text = raw[match.start() :].decode("utf-8", "replace")
+        obj = _decode_braced_json(text, "__WML_REDUX_INITIAL_STATE__")
+        if obj is not None:
+            return obj
+
+    return extract_embedded_data_soup(raw)
+
+
+def extract_embedded_data_soup(html: str | bytes) -> dict | list | None:
+    soup = BeautifulSoup(html, "html.parser")
+
+    next_data_script = soup.find("script", id="__NEXT_DATA__")
+    if next_data_script and next_data_script.string:
+        try:
+            return json_loads(next_data_script.string)
+        except ValueError:
+            pass
+
+    for script in soup.find_all("script"):
+        text = script.string or script.get_text() or ""
+        if "__WML_REDUX_INITIAL_STATE__" not in text:
+            continue
+        obj = _decode_braced_json(text, "__WML_REDUX_INITIAL_STATE__")
+        if obj is not None:
+            return obj
+
+    return None
+
+
+def page_is_not_found(html: str, final_url: str) -> bool:
+    lowered = html.lower()
+    if any(token in lowered for token in ["404", "page introuvable", "page not found"]):
+        return True
+    return "/errors/" in final_url.lower()
+
+
+def page_is_blocked(html: str, final_url: str) -> bool:
+    lowered = html.lower()
+    blocked_tokens = [
+        "access denied",
+        "automated access",
+        "captcha",
+        "verify you are human",
+        "forbidden",
+    ]
+    if any(token in lowered for token in blocked_tokens):
+        return True
+    return "/blocked" in final_url.lower()
+
+
+def status_result(
+    sku: str, status: str, store_id: str, store_slug: str, checked_at: str
+) -> dict[str, object]:
+    return {
+        "sku": sku,
+        "status": status,
+        "store_id": store_id,
+        "store_slug": store_slug,
+        "checked_at": checked_at,
+    }
+
+
+def finish_result(
+    extracted: dict, store_id: str, store_slug: str, checked_at: str
+) -> dict[str, object]:
+    if extracted.get("in_stock") is False:
+        extracted["status"] = "out_of_stock"
+    elif extracted.get("price_current") is not None:
+        extracted["status"] = "ok"
+    else:
+        extracted["status"] = "not_found"
+
+    extracted.update(
+        {
+            "store_id": store_id,
+            "store_slug": store_slug,
+            "checked_at": checked_at,
+        }
+    )
+    return extracted
+
+
+@functools.lru_cache(maxsize=4096)
+def _norm_sku(sku: str) -> str:
+    return sku.strip()
+
+
+def _first_str(node: dict, keys: tuple[str, ...]) -> str | None:
+    for key in keys:
+        value = node.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def _number_from(value: object) -> float | None:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = _PRICE_CLEAN_RE.sub("", value).replace(",", "")
+        if not cleaned:
+            return None
+        try:
+            return float(cleaned)
+        except ValueError:
+            return None
+    if isinstance(value, dict):
+        for key in _PRICE_SUBKEYS:
+            if key in value:
+                found = _number_from(value[key])
+                if found is not None:
+                    return found
+    return None
+
+
+# Where the product node normally sits in a __NEXT_DATA__ payload; the
+# generic tree walk is only needed when this shape changes.
+_PRODUCT_PATH = ("props", "pageProps", "initialData", "data", "product")
+
+
+def _dig(data: object, path: tuple[str, ...]) -> object | None:
+    # Plain subscripting with one except beats per-key isinstance checks:
+    # the happy path runs without any Python-level branching.
+    try:
+        for key in path:
+            data = data[key]
+    except (KeyError, TypeError):
+        return None
+    return data
+
+
+def _product_fast_path(data: object) -> dict | None:
+    node = _dig(data, _PRODUCT_PATH)
+    return node if isinstance(node, dict) else None
+
+
+def extract_product_fields(data: dict | list, sku: str) -> dict | None:
+    sku_norm = _norm_sku(str(sku))
+    product: dict | None = None
+    fallback: dict | None = None
+
+    candidate = _product_fast_path(data)
+    if candidate is not None and _first_str(candidate, _TITLE_KEYS):
+        candidate_sku = candidate.get("sku") or candidate.get("id") or candidate.get("usItemId")
+        if not isinstance(candidate_sku, (str, int)) or str(candidate_sku).strip() == sku_norm:
+            product = candidate
+
+    if product is None:
+        # Iterative pre-order walk: no generator frames, and the search
+        # stops at the first node whose SKU matches exactly.
+        stack: list[object] = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                stack.extend(reversed(node.values()))
+                title = _first_str(node, _TITLE_KEYS)
+                if not title:
+                    continue
+                node_sku = node.get("sku") or node.get("id") or node.get("usItemId")
+                if isinstance(node_sku, (str, int)) and str(node_sku).strip() == sku_norm:
+                    product = node
+                    break
+                if fallback is None:
+                    fallback = node
+            elif isinstance(node, list):
+                stack.extend(reversed(node))
+
+    if product is None:
+        product = fallback
+    if not product:
+        return None
+
+    title = _first_str(product, _TITLE_KEYS)
+    if not title:
+        return None
+
+    price_current = None
+    for key in _CUR_PRICE_KEYS:
+        if key in product:
+            price_current = _number_from(product[key])
+            if price_current is not None:
+                break
+
+    price_regular = None
+    for key in _REG_PRICE_KEYS:
+        if key in product:
+            price_regular = _number_from(product[key])
+            if price_regular is not None:
+                break
+
+    availability_text = _first_str(product, _AVAIL_KEYS)
+
+    in_stock = product.get("inStock")
+    if not isinstance(in_stock, bool):
+        match = _AVAIL_RE.search(availability_text.lower()) if availability_text else None
+        in_stock = _AVAIL_MAP[match.group(0)] if match else None
+
+    return {
+        "sku": str(product.get("sku") or sku),
+        "title": title,
+        "price_current": price_current,
+        "price_regular": price_regular,
+        "in_stock": in_stock,
+        "availability": availability_text,
+    }
@@ -0,0 +1,123 @@
+"""Streaming writer for per-store snapshot files."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+from scraper.extract import json_dumps, json_loads
+
+# Store identity is written once in the snapshot header; rows carry only
+# the per-SKU fields, in this column order.
+SNAPSHOT_COLUMNS = (
+    "sku",
+    "status",
+    "title",
+    "price_current",
+    "price_regular",
+    "in_stock",
+    "availability",
+    "checked_at",
+)
+
+
+class SnapshotWriter:
+    """Streams a store snapshot to disk one result at a time.
+
+    Results are written as they complete, so peak memory stays flat and a
+    crash mid-store loses only the unwritten tail instead of everything.
+    """
+
+    def __init__(self, path: Path, store_id: str, store_slug: str) -> None:
+        self.path = path
+        self.count = 0
+        self._f = path.open("w", encoding="utf-8")
+        self._f.write(
+            "{\n"
+            f'  "store_id": {json_dumps(store_id)},\n'
+            f'  "store_slug": {json_dumps(store_slug)},\n'
+            f'  "columns": {json_dumps(list(SNAPSHOT_COLUMNS))},\n'
+            '  "rows": [\n'
+        )
+
+    def write(self, result: dict[str, object]) -> None:
+        self.write_row([result.get(column) for column in SNAPSHOT_COLUMNS])
+
+    def write_row(self, row: list[object]) -> None:
+        if self.count:
+            self._f.write(",\n")
+        self._f.write("    ")
+        self._f.write(json_dumps(row))
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.write("\n  ]\n}\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+
+
+def snapshot_is_complete(path: Path) -> bool:
+    """True when ``path`` parses as a whole snapshot (its trailer was written).
+
+    A file that passes this check came from a run that finished the store,
+    so it should be re-scraped rather than resumed.
+    """
+    try:
+        doc = json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        return False
+    return isinstance(doc, dict) and isinstance(doc.get("rows"), list)
+
+
+def load_partial_rows(path: Path) -> list[list[object]]:
+    """Recover rows from a snapshot a crashed run left behind.
+
+    The writer streams one row per line, so a file missing its trailer
+    still parses line by line; anything malformed is skipped. Callers
+    must check ``snapshot_is_complete`` first — on a finished snapshot
+    this recovers every row, which is resuming stale data, not a crash.
+    """
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+
+    rows: list[list[object]] = []
+    for line in lines:
+        candidate = line.strip().rstrip(",")
+        if not candidate.startswith("["):
+            continue
+        try:
+            row = json_loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(row, list) and len(row) == len(SNAPSHOT_COLUMNS):
+            rows.append(row)
+    return rows
+
+
+def snapshot_content_digest(path: Path) -> bytes | None:
+    """Digest of a snapshot's rows with the checked_at column blanked.
+
+    Two runs that observed the same catalog state hash equal even though
+    every row carries a fresh timestamp; None means the file could not be
+    read as a snapshot.
+    """
+    try:
+        doc = json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    rows = doc.get("rows") if isinstance(doc, dict) else None
+    if not isinstance(rows, list):
+        return None
+
+    ts_index = SNAPSHOT_COLUMNS.index("checked_at")
+    digest = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        if isinstance(row, list) and len(row) > ts_index:
+            row = row[:ts_index] + [None] + row[ts_index + 1 :]
+        digest.update(json_dumps(row).encode())
+        digest.update(b"\n")
+    return digest.digest()
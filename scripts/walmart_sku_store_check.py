@@ -3,303 +3,519 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
 import os
-import re
+import random
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlsplit
 import sys
 
-from bs4 import BeautifulSoup
-from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
-from playwright.sync_api import Page, sync_playwright
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Browser, Page, async_playwright
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
 from scraper import load_skus, load_stores
+from scraper.extract import (
+    extract_embedded_data,
+    extract_product_fields,
+    finish_result,
+    json_dumps,
+    json_loads,
+    page_is_blocked,
+    page_is_not_found,
+    status_result,
+)
+from scraper.snapshots import (
+    SnapshotWriter,
+    load_partial_rows,
+    snapshot_content_digest,
+    snapshot_is_complete,
+)
 
 BASE_URL = "https://www.walmart.ca/fr/ip/{sku}"
 BLOCKED_SAMPLE_SIZE = 5
+# Pages in one context share cookies/localStorage, so the pickup store set
+# during warmup applies to every worker page. CI runners have fewer cores.
+MAX_CONCURRENCY = int(os.getenv("SKU_WORKERS", "4" if os.getenv("CI") else "8"))
+# Each store runs in its own BrowserContext, so stores can scrape in
+# parallel without clobbering each other's pickup-store selection.
+STORE_CONCURRENCY = int(os.getenv("STORE_WORKERS", "2" if os.getenv("CI") else "4"))
+REQUESTS_PER_SECOND = 2.0
+STORAGE_STATE_DIR = Path("snapshots/.cache/storage")
+STORAGE_STATE_MAX_AGE_S = 7 * 24 * 3600
+NEXTDATA_CACHE_DIR = Path("snapshots/.cache/nextdata")
+# The embedded JSON lives in the initial HTML; none of these are parsed.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+BLOCKED_HOSTS = ("doubleclick.net", "google-analytics.com", "adservice.google.com")
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "fr-CA,fr;q=0.9,en-CA;q=0.8",
+}
+
+
+def build_client() -> httpx.AsyncClient:
+    # An explicit transport overrides the client-level http2/limits
+    # arguments, so everything connection-related is configured on it.
+    # Keep as many warm connections as there can be in-flight requests so
+    # no fetch ever pays a fresh TCP+TLS handshake mid-run.
+    pool_size = max(10, STORE_CONCURRENCY * MAX_CONCURRENCY)
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=60.0,
+        ),
+        retries=3,
+    )
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=25.0,
+        transport=transport,
+        follow_redirects=True,
+    )
 
 
-def _extract_braced_json(raw_text: str, marker: str) -> str | None:
-    marker_pos = raw_text.find(marker)
-    if marker_pos < 0:
-        return None
+async def _wait_network_idle(page: Page, timeout_ms: int = 15_000) -> None:
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        await page.wait_for_timeout(1500)
+
+
+class RateLimiter:
+    """Token-bucket limiter shared by every worker in the run.
+
+    Tokens refill at ``rps`` up to ``burst``, so time spent fetching and
+    parsing counts toward the budget: a quiet stretch earns a short burst
+    of back-to-back requests, while the long-run rate stays capped. A
+    fixed sleep between SKUs would add idle wait after slow requests and
+    allow none of that catch-up.
+    """
+
+    def __init__(self, rps: float, burst: int = 5) -> None:
+        self.rate = rps
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+                self._updated = time.monotonic()
+                self._tokens = 1.0
+            self._tokens -= 1.0
+
+
+async def _route_filter(route) -> None:
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+        return
+    host = urlsplit(request.url).hostname or ""
+    if host.endswith(BLOCKED_HOSTS):
+        await route.abort()
+        return
+    await route.continue_()
+
+
+def _storage_state_is_valid(path: Path, store_id: str) -> bool:
+    """True when ``path`` is fresh and holds the pickup store for ``store_id``.
+
+    Checking the stored storeId, not just the file's age, guards against a
+    stale or mismatched state file silently scraping prices for the wrong
+    store.
+    """
+    try:
+        if time.time() - path.stat().st_mtime >= STORAGE_STATE_MAX_AGE_S:
+            return False
+        state = json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        return False
+    if not isinstance(state, dict):
+        return False
+    for origin in state.get("origins", []):
+        for item in origin.get("localStorage", []):
+            if item.get("name") != "pickupStore":
+                continue
+            try:
+                stored = json_loads(item.get("value", ""))
+            except ValueError:
+                return False
+            return isinstance(stored, dict) and str(stored.get("storeId")) == store_id
+    return False
+
+
+async def _set_store_context(context, store_id: str) -> None:
+    """Select the pickup store for every page of ``context``.
+
+    An init script seeds localStorage before the site's own scripts run,
+    so one warmup navigation replaces the old load/evaluate/reload dance.
+    """
+    await context.add_init_script(
+        "localStorage.setItem('pickupStore', "
+        f"JSON.stringify({{ storeId: {json_dumps(store_id)} }}));"
+    )
+    page = await context.new_page()
+    await page.goto("https://www.walmart.ca/", wait_until="domcontentloaded", timeout=30_000)
+    await _wait_network_idle(page)
+    await page.close()
 
-    start = raw_text.find("{", marker_pos)
-    if start < 0:
-        return None
 
-    depth = 0
-    in_string = False
-    escaped = False
-    for idx in range(start, len(raw_text)):
-        ch = raw_text[idx]
-        if in_string:
-            if escaped:
-                escaped = False
-            elif ch == "\\":
-                escaped = True
-            elif ch == '"':
-                in_string = False
-            continue
-
-        if ch == '"':
-            in_string = True
-        elif ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                return raw_text[start : idx + 1]
+def _etag_cache_load(sku: str) -> dict | None:
+    try:
+        cached = json_loads((NEXTDATA_CACHE_DIR / f"{sku}.json").read_bytes())
+    except (OSError, ValueError):
+        return None
+    if isinstance(cached, dict) and cached.get("etag") and isinstance(cached.get("extracted"), dict):
+        return cached
     return None
 
 
-def _extract_embedded_data(html: str) -> dict | list | None:
-    soup = BeautifulSoup(html, "html.parser")
-
-    next_data_script = soup.find("script", id="__NEXT_DATA__")
-    if next_data_script and next_data_script.string:
-        try:
-            return json.loads(next_data_script.string)
-        except json.JSONDecodeError:
-            pass
-
-    for script in soup.find_all("script"):
-        text = script.string or script.get_text() or ""
-        if "__WML_REDUX_INITIAL_STATE__" not in text:
-            continue
-        payload = _extract_braced_json(text, "__WML_REDUX_INITIAL_STATE__")
-        if not payload:
-            continue
-        try:
-            return json.loads(payload)
-        except json.JSONDecodeError:
-            continue
-
-    return None
+def _etag_cache_store(sku: str, etag: str, extracted: dict) -> None:
+    NEXTDATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    payload = {"etag": etag, "extracted": extracted}
+    (NEXTDATA_CACHE_DIR / f"{sku}.json").write_text(json_dumps(payload), encoding="utf-8")
 
 
-def _walk_items(node):
-    if isinstance(node, dict):
-        yield node
-        for value in node.values():
-            yield from _walk_items(value)
-    elif isinstance(node, list):
-        for item in node:
-            yield from _walk_items(item)
+async def fetch_sku_store_data_http(
+    client: httpx.AsyncClient,
+    sku: str,
+    store_id: str,
+    store_slug: str,
+    checked_at: str,
+    store_headers: dict[str, str] | None = None,
+) -> dict[str, object] | None:
+    """Fast path: plain HTTP fetch of the server-rendered product page.
 
+    Returns None when the response looks blocked or lacks embedded data,
+    signalling the caller to retry through Playwright.
+    """
+    url = BASE_URL.format(sku=sku)
 
-def _first_str(node: dict, keys: list[str]) -> str | None:
-    for key in keys:
-        value = node.get(key)
-        if isinstance(value, str) and value.strip():
-            return value.strip()
-    return None
-
+    headers = dict(store_headers) if store_headers else {}
+    cached = await asyncio.to_thread(_etag_cache_load, sku)
+    if cached:
+        headers["If-None-Match"] = cached["etag"]
+    try:
+        response = await client.get(url, headers=headers or None)
+    except httpx.HTTPError:
+        return None
 
-def _number_from(value) -> float | None:
-    if isinstance(value, (int, float)):
-        return float(value)
-    if isinstance(value, str):
-        cleaned = re.sub(r"[^0-9.,-]", "", value).replace(",", "")
-        if not cleaned:
-            return None
-        try:
-            return float(cleaned)
-        except ValueError:
-            return None
-    if isinstance(value, dict):
-        for key in ("price", "value", "amount", "current", "minPrice"):
-            if key in value:
-                found = _number_from(value[key])
-                if found is not None:
-                    return found
-    return None
+    if response.status_code == 304 and cached:
+        # Page unchanged since last run: skip the download and the whole
+        # extraction pipeline, just restamp the cached fields.
+        return finish_result(dict(cached["extracted"]), store_id, store_slug, checked_at)
 
+    html = response.text
+    final_url = str(response.url)
+    if response.status_code in (403, 429) or page_is_blocked(html, final_url):
+        return None
 
-def _extract_product_fields(data, sku: str) -> dict | None:
-    sku_norm = str(sku).strip()
-    candidates: list[dict] = []
-    fallback_candidates: list[dict] = []
+    if response.status_code == 404 or page_is_not_found(html, final_url):
+        return status_result(sku, "not_found", store_id, store_slug, checked_at)
 
-    for node in _walk_items(data):
-        node_sku = node.get("sku") or node.get("id") or node.get("usItemId")
-        title = _first_str(node, ["name", "title", "productName"])
-        if not title:
-            continue
+    embedded_data = extract_embedded_data(response.content)
+    if embedded_data is None:
+        return None
 
-        if isinstance(node_sku, (str, int)) and str(node_sku).strip() == sku_norm:
-            candidates.append(node)
-        else:
-            fallback_candidates.append(node)
+    extracted = extract_product_fields(embedded_data, sku)
+    if not extracted:
+        return status_result(sku, "not_found", store_id, store_slug, checked_at)
 
-    product = candidates[0] if candidates else (fallback_candidates[0] if fallback_candidates else None)
-    if not product:
-        return None
+    etag = response.headers.get("ETag")
+    if etag:
+        await asyncio.to_thread(_etag_cache_store, sku, etag, extracted)
 
-    title = _first_str(product, ["name", "title", "productName"])
-    if not title:
-        return None
+    return finish_result(extracted, store_id, store_slug, checked_at)
 
-    price_current = None
-    for key in ("currentPrice", "price", "priceDisplay", "finalPrice"):
-        if key in product:
-            price_current = _number_from(product[key])
-            if price_current is not None:
-                break
-
-    price_regular = None
-    for key in ("wasPrice", "regularPrice", "listPrice", "compareAtPrice"):
-        if key in product:
-            price_regular = _number_from(product[key])
-            if price_regular is not None:
-                break
-
-    availability_text = _first_str(
-        product,
-        ["availabilityStatus", "availabilityText", "fulfillmentLabel", "inventoryStatus"],
-    )
 
-    in_stock = product.get("inStock")
-    if not isinstance(in_stock, bool):
-        status_lower = (availability_text or "").lower()
-        if any(token in status_lower for token in ["in stock", "available", "pickup"]):
-            in_stock = True
-        elif any(token in status_lower for token in ["out of stock", "unavailable", "sold out", "rupture"]):
-            in_stock = False
-        else:
-            in_stock = None
-
-    return {
-        "sku": str(product.get("sku") or sku),
-        "title": title,
-        "price_current": price_current,
-        "price_regular": price_regular,
-        "in_stock": in_stock,
-        "availability": availability_text,
-    }
+async def fetch_sku_store_data(
+    page: Page, sku: str, store_id: str, store_slug: str, checked_at: str
+) -> dict[str, object]:
+    url = BASE_URL.format(sku=sku)
 
+    try:
+        # The embedded JSON is in the initial HTML bytes; "commit" returns
+        # as soon as the navigation starts and the selector wait below
+        # covers the only element the scraper needs.
+        response = await page.goto(url, wait_until="commit", timeout=35_000)
+    except PlaywrightTimeoutError:
+        return status_result(sku, "not_found", store_id, store_slug, checked_at)
 
-def _wait_network_idle(page: Page, timeout_ms: int = 15_000) -> None:
     try:
-        page.wait_for_load_state("networkidle", timeout=timeout_ms)
+        await page.wait_for_selector("script#__NEXT_DATA__", state="attached", timeout=15_000)
     except PlaywrightTimeoutError:
-        page.wait_for_timeout(1500)
-
-
-def _page_is_not_found(html: str, final_url: str) -> bool:
-    lowered = html.lower()
-    if any(token in lowered for token in ["404", "page introuvable", "page not found"]):
-        return True
-    return "/errors/" in final_url.lower()
-
-
-def _page_is_blocked(html: str, final_url: str) -> bool:
-    lowered = html.lower()
-    blocked_tokens = [
-        "access denied",
-        "automated access",
-        "captcha",
-        "verify you are human",
-        "forbidden",
-    ]
-    if any(token in lowered for token in blocked_tokens):
-        return True
-    return "/blocked" in final_url.lower()
-
-
-def _set_store_context(page: Page, store_id: str) -> None:
-    page.goto("https://www.walmart.ca/", wait_until="domcontentloaded", timeout=30_000)
-    _wait_network_idle(page)
-    page.evaluate(
-        """(storeId) => {
-            localStorage.setItem('pickupStore', JSON.stringify({ storeId }));
-        }""",
-        store_id,
+        # Blocked and error pages have no __NEXT_DATA__; the status/token
+        # checks below classify them.
+        pass
+
+    status_code = response.status if response else None
+
+    # One evaluate round-trip pulls the embedded JSON straight out of the
+    # live DOM; serializing the whole page with page.content() is only
+    # needed when that misses. The probe is the script's bare text, so it
+    # is parsed directly rather than through the tag-matching extractor.
+    probe = await page.evaluate(
+        "() => { const n = document.getElementById('__NEXT_DATA__');"
+        " return n ? n.textContent : null; }"
     )
-    page.reload(wait_until="domcontentloaded", timeout=30_000)
-    _wait_network_idle(page)
+    if probe and status_code not in (403, 404, 429):
+        try:
+            embedded_data = json_loads(probe)
+        except ValueError:
+            embedded_data = None
+        if embedded_data is not None:
+            extracted = extract_product_fields(embedded_data, sku)
+            if extracted:
+                return finish_result(extracted, store_id, store_slug, checked_at)
 
+    html = await page.content()
+    if status_code in (403, 429) or page_is_blocked(html, page.url):
+        return status_result(sku, "blocked", store_id, store_slug, checked_at)
 
-def fetch_sku_store_data(page: Page, sku: str, store_id: str, store_slug: str) -> dict[str, object]:
-    checked_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
-    url = BASE_URL.format(sku=sku)
+    if status_code == 404 or page_is_not_found(html, page.url):
+        return status_result(sku, "not_found", store_id, store_slug, checked_at)
 
-    try:
-        response = page.goto(url, wait_until="domcontentloaded", timeout=35_000)
-        _wait_network_idle(page)
-    except PlaywrightTimeoutError:
-        return {
-            "sku": sku,
-            "status": "not_found",
-            "store_id": store_id,
-            "store_slug": store_slug,
-            "checked_at": checked_at,
-        }
-
-    html = page.content()
-    status_code = response.status if response else None
-    if status_code in (403, 429) or _page_is_blocked(html, page.url):
-        return {
-            "sku": sku,
-            "status": "blocked",
-            "store_id": store_id,
-            "store_slug": store_slug,
-            "checked_at": checked_at,
-        }
-
-    if status_code == 404 or _page_is_not_found(html, page.url):
-        return {
-            "sku": sku,
-            "status": "not_found",
-            "store_id": store_id,
-            "store_slug": store_slug,
-            "checked_at": checked_at,
-        }
-
-    embedded_data = _extract_embedded_data(html)
+    embedded_data = extract_embedded_data(html)
     if embedded_data is None:
-        return {
-            "sku": sku,
-            "status": "not_found",
-            "store_id": store_id,
-            "store_slug": store_slug,
-            "checked_at": checked_at,
-        }
-
-    extracted = _extract_product_fields(embedded_data, sku)
+        return status_result(sku, "not_found", store_id, store_slug, checked_at)
+
+    extracted = extract_product_fields(embedded_data, sku)
     if not extracted:
-        return {
-            "sku": sku,
-            "status": "not_found",
-            "store_id": store_id,
-            "store_slug": store_slug,
-            "checked_at": checked_at,
-        }
-
-    if extracted.get("in_stock") is False:
-        extracted["status"] = "out_of_stock"
-    elif extracted.get("price_current") is not None:
-        extracted["status"] = "ok"
+        return status_result(sku, "not_found", store_id, store_slug, checked_at)
+
+    return finish_result(extracted, store_id, store_slug, checked_at)
+
+
+async def _sku_worker(
+    queue: asyncio.Queue[str],
+    client: httpx.AsyncClient,
+    limiter: RateLimiter,
+    context,
+    store_id: str,
+    store_slug: str,
+    checked_at: str,
+    store_headers: dict[str, str] | None,
+    writer: SnapshotWriter,
+    summary_counts: dict[str, int],
+    first_statuses: list[str],
+    stop_event: asyncio.Event,
+    stop_on_initial_blocked: bool,
+    blocked_sample: int,
+    start_delay: float = 0.0,
+) -> None:
+    # Stagger worker start so a store ramping up does not fire its whole
+    # pool at the origin in the same instant.
+    if start_delay > 0:
+        await asyncio.sleep(start_delay)
+
+    async def _http_fetch(sku: str) -> dict[str, object] | None:
+        await limiter.acquire()
+        return await fetch_sku_store_data_http(
+            client, sku, store_id, store_slug, checked_at, store_headers
+        )
+
+    page: Page | None = None
+
+    def _next_job() -> tuple[str, asyncio.Task] | None:
+        try:
+            sku = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+        return sku, asyncio.create_task(_http_fetch(sku))
+
+    job = _next_job()
+    while job is not None:
+        sku, task = job
+        if stop_event.is_set():
+            task.cancel()
+            queue.task_done()
+            return
+
+        print(f"Fetching {store_slug} {sku}")
+        try:
+            result = await task
+        except Exception as e:
+            print(f"[{store_slug}] FAIL sku={sku}: {e}")
+            result = status_result(sku, "not_found", store_id, store_slug, checked_at)
+
+        # Pipeline: kick off the next SKU's HTTP fetch now, so its network
+        # wait overlaps this SKU's Playwright fallback and result handling.
+        job = _next_job()
+
+        if result is None:
+            try:
+                if page is None:
+                    # Pages exist only for the Playwright fallback; a store
+                    # fully served over HTTP never pays page init at all.
+                    page = await context.new_page()
+                # The fallback navigation hits the same origin as the HTTP
+                # fetch, so it draws from the same rate budget.
+                await limiter.acquire()
+                result = await fetch_sku_store_data(page, sku, store_id, store_slug, checked_at)
+            except Exception as e:
+                print(f"[{store_slug}] FAIL sku={sku}: {e}")
+                result = status_result(sku, "not_found", store_id, store_slug, checked_at)
+        queue.task_done()
+
+        status = str(result.get("status", "not_found"))
+        if len(first_statuses) < blocked_sample:
+            first_statuses.append(status)
+            if (
+                stop_on_initial_blocked
+                and len(first_statuses) == blocked_sample
+                and all(item == "blocked" for item in first_statuses)
+            ):
+                stop_event.set()
+
+        if status == "ok":
+            summary_counts["ok"] += 1
+        elif status == "out_of_stock":
+            summary_counts["oos"] += 1
+        elif status == "blocked":
+            summary_counts["blocked"] += 1
+        else:
+            summary_counts["nf"] += 1
+
+        print(
+            f"[{store_slug}] sku={sku} status={status} "
+            f"price={result.get('price_current')} stock={result.get('in_stock')}"
+        )
+
+        writer.write(result)
+
+
+async def _scrape_store(
+    browser: Browser,
+    client: httpx.AsyncClient,
+    limiter: RateLimiter,
+    skus: list[str],
+    store_id: str,
+    store_slug: str,
+    writer: SnapshotWriter,
+    stop_on_initial_blocked: bool,
+) -> dict[str, int]:
+    """Scrape every SKU for one store inside a dedicated BrowserContext.
+
+    The context owns the store-selection cookies/localStorage, so stores
+    running concurrently on the shared Browser cannot clobber each
+    other's pickup store; it is closed when the store finishes.
+    """
+    state_path = STORAGE_STATE_DIR / f"{store_id}.json"
+    if _storage_state_is_valid(state_path, store_id):
+        # Restoring localStorage['pickupStore'] from disk skips the two
+        # warmup page loads against walmart.ca entirely.
+        context = await browser.new_context(locale="fr-CA", storage_state=str(state_path))
+        await context.route("**/*", _route_filter)
     else:
-        extracted["status"] = "not_found"
-
-    extracted.update(
-        {
-            "store_id": store_id,
-            "store_slug": store_slug,
-            "checked_at": checked_at,
-        }
-    )
-    return extracted
+        context = await browser.new_context(locale="fr-CA")
+        await context.route("**/*", _route_filter)
+        await limiter.acquire()
+        await _set_store_context(context, store_id)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        await context.storage_state(path=str(state_path))
+
+    # Export the warmed context's cookies so the HTTP fast path carries the
+    # same store selection as the browser pages.
+    cookies = await context.cookies("https://www.walmart.ca")
+    cookie_header = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+    store_headers = {"Cookie": cookie_header} if cookie_header else None
+
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for sku in skus:
+        queue.put_nowait(sku)
+
+    # One timestamp per store batch; the field describes the check run, so
+    # there is no need to re-format a datetime for every SKU, nor for the
+    # finer per-second caching a per-SKU isoformat would call for.
+    batch_checked_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    summary_counts = {"ok": 0, "nf": 0, "oos": 0, "blocked": 0}
+    first_statuses: list[str] = []
+    stop_event = asyncio.Event()
+
+    # A store with fewer SKUs than the sample size (possibly after a
+    # resume trimmed the list) must still be able to trip the early exit.
+    blocked_sample = min(BLOCKED_SAMPLE_SIZE, len(skus))
+    worker_count = min(MAX_CONCURRENCY, len(skus))
+    try:
+        await asyncio.gather(
+            *(
+                _sku_worker(
+                    queue,
+                    client,
+                    limiter,
+                    context,
+                    store_id,
+                    store_slug,
+                    batch_checked_at,
+                    store_headers,
+                    writer,
+                    summary_counts,
+                    first_statuses,
+                    stop_event,
+                    stop_on_initial_blocked,
+                    blocked_sample,
+                    start_delay=index * random.uniform(0.2, 0.6),
+                )
+                for index in range(worker_count)
+            )
+        )
+    finally:
+        await context.close()
+
+    if stop_on_initial_blocked and stop_event.is_set():
+        print(
+            f"[{store_slug}] First {blocked_sample} SKUs are blocked; "
+            "stopping early to avoid hammering Walmart."
+        )
+        raise SystemExit(10)
+
+    return summary_counts
+
+
+def _finalize_snapshot(
+    writer: SnapshotWriter, out_path: Path, prev_dir: Path, store_slug: str
+) -> None:
+    """Close the snapshot, then hardlink it to yesterday's when unchanged.
+
+    Slow-moving catalogs rewrite identical data every run; comparing row
+    digests (timestamps excluded) turns those runs into a shared inode
+    instead of another full copy on disk.
+    """
+    writer.close()
+    prev_path = prev_dir / out_path.name
+    if not prev_path.exists():
+        return
+    digest = snapshot_content_digest(out_path)
+    if digest is None or digest != snapshot_content_digest(prev_path):
+        return
+    try:
+        out_path.unlink()
+        os.link(prev_path, out_path)
+    except OSError:
+        return
+    print(f"[{store_slug}] Snapshot unchanged since {prev_dir.name}; hardlinked to previous day")
 
 
-def main() -> None:
+async def _main_async() -> None:
     print("SKUS FILE EXISTS:", Path("input/skus.json").exists())
     print("STORES FILE EXISTS:", Path("input/stores.json").exists())
 
@@ -314,6 +530,7 @@ def main() -> None:
 
     out_dir = Path("snapshots") / datetime.utcnow().strftime("%Y-%m-%d")
     out_dir.mkdir(parents=True, exist_ok=True)
+    prev_dir = Path("snapshots") / (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
 
     stop_on_initial_blocked = os.getenv("STOP_ON_INITIAL_BLOCKED", "").lower() in {
         "1",
@@ -321,96 +538,100 @@ def main() -> None:
         "yes",
     }
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
+    async with async_playwright() as p, build_client() as client:
+        browser = await p.chromium.launch(headless=True)
+        close_tasks: list[asyncio.Task] = []
+        store_sem = asyncio.Semaphore(STORE_CONCURRENCY)
+        # One limiter for the whole run: REQUESTS_PER_SECOND caps what the
+        # origin sees regardless of how many stores run concurrently.
+        limiter = RateLimiter(REQUESTS_PER_SECOND)
 
-        for store in stores:
+        async def run_store(store: dict[str, str]) -> None:
             store_id = store.get("store_id")
             store_slug = store.get("store_slug")
             if not store_id or not store_slug:
                 raise ValueError("Each store must include store_id and store_slug")
 
-            context = browser.new_context(locale="fr-CA")
-            page = context.new_page()
-            _set_store_context(page, str(store_id))
-
-            results: list[dict[str, object]] = []
-            summary_counts = {"ok": 0, "nf": 0, "oos": 0, "blocked": 0}
-            first_statuses: list[str] = []
+            async with store_sem:
+                out_path = out_dir / f"{store_slug}.json"
+
+                # Resume: rows streamed before a crash earlier today are
+                # carried over so only the missing SKUs get re-scraped. A
+                # snapshot with its trailer intact came from a finished
+                # run (possibly one that exited on the blocked sample), so
+                # a same-day rerun re-checks everything instead.
+                recovered = (
+                    load_partial_rows(out_path)
+                    if out_path.exists() and not snapshot_is_complete(out_path)
+                    else []
+                )
+                done_skus = {str(row[0]) for row in recovered}
+                remaining = [sku for sku in skus if sku not in done_skus]
+
+                # Today's file may be a hardlink to yesterday's (see
+                # _finalize_snapshot); unlink before rewriting so the
+                # shared inode is not truncated.
+                out_path.unlink(missing_ok=True)
+                writer = SnapshotWriter(out_path, str(store_id), str(store_slug))
+                for row in recovered:
+                    writer.write_row(row)
+                if recovered:
+                    print(
+                        f"[{store_slug}] Resumed {len(recovered)} SKUs from a previous "
+                        f"run; {len(remaining)} left to scrape"
+                    )
 
-            for sku in skus:
-                print(f"Fetching {store_slug} {sku}")
+                summary_counts = {"ok": 0, "nf": 0, "oos": 0, "blocked": 0}
                 try:
-                    result = fetch_sku_store_data(page, sku, str(store_id), str(store_slug))
-                except Exception as e:
-                    print(f"[{store_slug}] FAIL sku={sku}: {e}")
-                    result = {
-                        "sku": sku,
-                        "status": "not_found",
-                        "store_id": store_id,
-                        "store_slug": store_slug,
-                        "checked_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
-                    }
-                finally:
-                    time.sleep(1)
-
-                status = str(result.get("status", "not_found"))
-                if len(first_statuses) < BLOCKED_SAMPLE_SIZE:
-                    first_statuses.append(status)
-                if status == "ok":
-                    summary_counts["ok"] += 1
-                elif status == "out_of_stock":
-                    summary_counts["oos"] += 1
-                elif status == "blocked":
-                    summary_counts["blocked"] += 1
-                else:
-                    summary_counts["nf"] += 1
+                    if remaining:
+                        summary_counts = await _scrape_store(
+                            browser,
+                            client,
+                            limiter,
+                            remaining,
+                            str(store_id),
+                            str(store_slug),
+                            writer,
+                            stop_on_initial_blocked,
+                        )
+                except BaseException:
+                    writer.close()
+                    raise
+
+                # Finalizing a snapshot fsyncs and hashes the file; push
+                # that to a thread so the next store starts immediately.
+                close_tasks.append(
+                    asyncio.create_task(
+                        asyncio.to_thread(
+                            _finalize_snapshot, writer, out_path, prev_dir, str(store_slug)
+                        )
+                    )
+                )
 
+                print(f"Wrote {out_path} ({writer.count} items)")
                 print(
-                    f"[{store_slug}] sku={sku} status={status} "
-                    f"price={result.get('price_current')} stock={result.get('in_stock')}"
+                    f"[{store_slug}] Summary ok={summary_counts['ok']} "
+                    f"nf={summary_counts['nf']} oos={summary_counts['oos']} "
+                    f"blocked={summary_counts['blocked']}"
                 )
 
-                results.append(result)
+        try:
+            await asyncio.gather(*(run_store(store) for store in stores))
+            await asyncio.gather(*close_tasks)
+        finally:
+            if close_tasks:
+                await asyncio.gather(*close_tasks, return_exceptions=True)
+            await browser.close()
 
-                if (
-                    stop_on_initial_blocked
-                    and len(first_statuses) == min(BLOCKED_SAMPLE_SIZE, len(skus))
-                    and all(item == "blocked" for item in first_statuses)
-                ):
-                    context.close()
-                    browser.close()
-                    print(
-                        f"[{store_slug}] First {len(first_statuses)} SKUs are blocked; "
-                        "stopping early to avoid hammering Walmart."
-                    )
-                    raise SystemExit(10)
-
-            context.close()
-
-            out_path = out_dir / f"{store_slug}.json"
-
-            with out_path.open("w", encoding="utf-8") as f:
-                json.dump(
-                    {
-                        "store_id": store_id,
-                        "store_slug": store_slug,
-                        "results": results,
-                    },
-                    f,
-                    indent=2,
-                    ensure_ascii=False,
-                )
-                f.write("\n")
 
-            print(f"Wrote {out_path} ({len(results)} items)")
-            print(
-                f"[{store_slug}] Summary ok={summary_counts['ok']} "
-                f"nf={summary_counts['nf']} oos={summary_counts['oos']} "
-                f"blocked={summary_counts['blocked']}"
-            )
-
-        browser.close()
+def main() -> None:
+    try:
+        import uvloop
+    except ImportError:  # optional speedup; the Windows local runner stays on asyncio
+        pass
+    else:
+        uvloop.install()
+    asyncio.run(_main_async())
 
 
 if __name__ == "__main__":